@@ -0,0 +1,90 @@
+"""
+Optional Numba fast path for the per-pixel hot loops of `img_modifier`.
+
+If `numba` is installed the kernels below are JIT-compiled once and run the
+grayscale-to-transparency update in parallel over the image rows, operating
+in place on a contiguous `uint8` RGBA array. If `numba` is not available
+`HAVE_NUMBA` is `False` and `img_modifier` falls back to its vectorized
+numpy path, i.e., this module is a pure optimization and no hard dependency.
+
+Dependencies:
+=============
+`numba` (optional)
+"""
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _gs_transp_w_false(d):
+        """ White reference, alpha always recomputed (clipped at 0). """
+        for i in prange(d.shape[0]):
+            for j in range(d.shape[1]):
+                g = d[i,j,0]
+                new_a = int(d[i,j,3]) - int(g)
+                d[i,j,1] = g
+                d[i,j,2] = g
+                d[i,j,3] = 0 if new_a < 0 else new_a
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _gs_transp_w_true(d):
+        """ White reference, previously transparent pixels keep their alpha. """
+        for i in prange(d.shape[0]):
+            for j in range(d.shape[1]):
+                g = d[i,j,0]
+                d[i,j,1] = g
+                d[i,j,2] = g
+                if d[i,j,3] == 255:
+                    d[i,j,3] = 255 - g
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _gs_transp_b_false(d):
+        """ Black reference, alpha always recomputed (clipped at 0). """
+        for i in prange(d.shape[0]):
+            for j in range(d.shape[1]):
+                g = d[i,j,0]
+                new_a = int(d[i,j,3]) - 255 + int(g)
+                d[i,j,1] = g
+                d[i,j,2] = g
+                d[i,j,3] = 0 if new_a < 0 else new_a
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _gs_transp_b_true(d):
+        """ Black reference, previously transparent pixels keep their alpha. """
+        for i in prange(d.shape[0]):
+            for j in range(d.shape[1]):
+                g = d[i,j,0]
+                d[i,j,1] = g
+                d[i,j,2] = g
+                if d[i,j,3] == 255:
+                    d[i,j,3] = g
+
+    def gs_transp(data, white, leave_alpha):
+        """
+        Run the grayscale-to-transparency update in place on `data`.
+
+        Parameters:
+        -----------
+        `data` : numpy.ndarray (uint8, shape HxWx4, C-contiguous)
+            RGBA image data; modified in place.
+        `white` : boolean
+            `True` for the white reference color, `False` for black.
+        `leave_alpha` : boolean
+            Same meaning as in `Img.grayscale_to_transp`.
+        """
+        if white:
+            if leave_alpha:
+                _gs_transp_w_true(data)
+            else:
+                _gs_transp_w_false(data)
+        else:
+            if leave_alpha:
+                _gs_transp_b_true(data)
+            else:
+                _gs_transp_b_false(data)
@@ -1,7 +1,12 @@
+import functools
 import os
+import pathlib
 import imageio
+import imageio.v3 as iio
 import numpy as np
 
+import _kernels ## optional Numba fast path; no-op if numba is missing
+
 
 def _yn_prompt(prompt, default=None):
     """
@@ -130,6 +135,79 @@ def _g_filedialog(initialdir=None, title=None, filetypes=None):
 
     return fullpath, filename, dir_path, file_ext, extstrip
 
+@functools.lru_cache(maxsize=None)
+def _build_luts(factor, method):
+    """
+    Precompute fixed-point lookup tables for `Img.grayscale`.
+
+    The grayscale blend of each output channel is a linear combination of
+    the three input channels with constant coefficients
+    `(1-factor)*delta(o, i) + factor*weight[i]`. For uint8 input each term
+    can thus be tabulated: entry `v` of table `(o, i)` holds
+    `round(coeff*256*v)` as uint16 (8.8 fixed point), so a new channel
+    value is `(lut_r[r] + lut_g[g] + lut_b[b]) >> 8` with integer arith-
+    metic only and no possibility of overflow (the coefficients sum to 1).
+    Tables are cached per `(factor, method)` combination.
+
+    Returns:
+    --------
+    A 3x3 nested tuple of 256-entry uint16 arrays, indexed by output
+    channel first and input channel second.
+    """
+    if method == 'luminosity':
+        weights = (0.299, 0.587, 0.114)
+    else:
+        weights = (1./3., 1./3., 1./3.)
+    ramp = np.arange(256, dtype=np.float64)
+    luts = []
+    for o in range(3):
+        luts.append(tuple(
+                np.round(((1.-factor)*(o == i) + factor*weights[i])
+                    * 256. * ramp).astype(np.uint16)
+                for i in range(3)
+            ))
+    return tuple(luts)
+
+def _transp_w_false(planes):
+    """ White reference, alpha always recomputed (clipped at 0). """
+    gray, alpha = planes[0], planes[3]
+    alpha[:] = np.clip(alpha.astype(np.int16) - gray, 0, 255
+        ).astype(np.uint8)
+    planes[1][:] = gray
+    planes[2][:] = gray
+
+def _transp_w_true(planes):
+    """ White reference, previously transparent pixels keep their alpha. """
+    gray, alpha = planes[0], planes[3]
+    alpha[:] = np.where(alpha != 255, alpha, (255-gray).astype(np.uint8))
+    planes[1][:] = gray
+    planes[2][:] = gray
+
+def _transp_b_false(planes):
+    """ Black reference, alpha always recomputed (clipped at 0). """
+    gray, alpha = planes[0], planes[3]
+    alpha[:] = np.clip(alpha.astype(np.int16) - 255 + gray, 0, 255
+        ).astype(np.uint8)
+    planes[1][:] = gray
+    planes[2][:] = gray
+
+def _transp_b_true(planes):
+    """ Black reference, previously transparent pixels keep their alpha. """
+    gray, alpha = planes[0], planes[3]
+    alpha[:] = np.where(alpha != 255, alpha, gray)
+    planes[1][:] = gray
+    planes[2][:] = gray
+
+## kernel dispatch for `Img.grayscale_to_transp`, keyed on (color, leave_
+## alpha); resolving the kernel once per call replaces both the per-call
+## closure construction and the per-block branching
+_TRANSP_KERNELS = {
+        ('w', False): _transp_w_false,
+        ('w', True):  _transp_w_true,
+        ('b', False): _transp_b_false,
+        ('b', True):  _transp_b_true,
+    }
+
 class InvalidParameterException(Exception):
     """ Exception for invalid parameter settings. """
     pass
@@ -159,10 +237,6 @@ class Img:
        especially concerning the handling of their colors. This might be
        related to their format (chroma subsampling YUV420/422/444). For PNGs it
        appears to work just as expected (test images use RGBA).
-     - The current performance is poor, i.e., the script is very slow to be
-       executed on images that have more than just a few pixels. A likely large
-       contribution to this fact is that the handling of numpy.arrays could be
-       improved at multiple points.
      - Initially this script relied on forward slashes (`/`) in paths, such as
        in Linux systems. This should be fixed by now, but it is not tested yet.
     
@@ -173,11 +247,16 @@ class Img:
      - `grayscale`: convert the current image to grayscale
      - `grayscale_to_tranp`: convert a grayscale image into tranparency based
        on each pixel's brightness
+     - `to_gray_transp`: `grayscale` and `grayscale_to_transp` fused into a
+       single pass over the image
 
     Dependencies:
     =============
-    `os`, `imageio`, `numpy` as `np`, `_yn_prompt`, `_g_filedialog` \\
-    (`_g_filedialog`'s dependencies: `tkinter`, `tkinter.filedialog`)
+    `os`, `imageio`, `imageio.v3` as `iio`, `numpy` as `np`, `_yn_prompt`, \\
+    `_g_filedialog` \\
+    (`_g_filedialog`'s dependencies: `tkinter`, `tkinter.filedialog`), \\
+    `_kernels` (optionally uses `numba` for a faster code path), \\
+    `tifffile` (optional, for memory-mapped TIFF access)
     """
 
     def __init__(self, filename=None):
@@ -198,8 +277,10 @@ class Img:
         `path` : Path to the file's parent directory (no trailing separator).\\
         `name` : Filename without extension, e.g. `testfile` or `test.file`. \\
         `ext` : File extension without a leading dot, e.g. `png`. \\
-        `data` : Image data via `imageio.imread`, also containing meta data. \\
-        `meta` : Image meta data via `imageio.imread` using its `meta` method.
+        `data` : Image data via `imageio.v3.imread`, decoded lazily on \\
+        first access. \\
+        `meta` : Image meta data via `imageio.v3.immeta`, read lazily on
+        first access.
 
         Information:
         ------------
@@ -219,38 +300,132 @@ class Img:
         if filename is None:
             filename = _g_filedialog()[0]
 
-        ## catch some cases the code cannot handle (yet?)
-        if filename[0] == '~': ## as I do not use pathlib.Path (yet) avoid `~`
-            raise InvalidParameterException(
-                "Using `~` for home is currently not supported."
-            )
-        if not os.path.isfile(filename):
+        ## normalize the path once (this also resolves `~` for home) and
+        ## derive all name parts from it without further parsing
+        p = pathlib.Path(filename).expanduser().resolve()
+        if not p.is_file():
             raise FileNotFoundError("No such file: '{}'".format(filename))
 
-        self.path, file = os.path.split(os.path.abspath(filename))
-        # self.name, self.ext = file.rsplit('.', 1)
-        self.name, self.ext = os.path.splitext(file)
-        self.ext = self.ext[1:]
+        self.path = str(p.parent)
+        self.name = p.stem
+        self.ext = p.suffix[1:]
+
+        ## data and meta data are read lazily on first access (cf. the
+        ## `data` and `meta` properties); only the filename is stored here
+        self._filename = str(p)
+        self._data = None
+        self._meta = None
+
+        ## internal channel-plane representation (cf. `_to_planes`)
+        self._planes = None
+
+    @property
+    def data(self):
+        """
+        Image data, decoded lazily on first access.
+
+        For TIFF files a memory map of the pixels on disk is tried first
+        (copy-on-write, i.e., modifications stay in memory), which avoids
+        decoding the whole file into RAM up front. All other formats are
+        read via `imageio.v3.imread`.
+        """
+        ## active channel planes hold the current state (cf. `_to_planes`),
+        ## i.e. re-interleave first so no stale array is handed out
+        self._to_interleaved()
+        if self._data is None:
+            if self.ext.lower() in ('tif', 'tiff'):
+                try:
+                    import tifffile
+                    self._data = tifffile.memmap(self._filename, mode='c')
+                except (ImportError, ValueError):
+                    pass ## not installed or not memory-mappable
+            if self._data is None:
+                self._data = iio.imread(self._filename)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._planes = None ## an explicit assignment supersedes the planes
+        self._data = value
+
+    @property
+    def meta(self):
+        """ Image meta data, read lazily on first access. """
+        if self._meta is None:
+            self._meta = iio.immeta(self._filename)
+        return self._meta
+
+    def _to_planes(self):
+        """
+        Split `self.data` into contiguous per-channel planes.
+
+        The interleaved HxWx4 layout makes channel-wise operations stride
+        over memory with a gap of 4 bytes per access. The transformations in
+        this class are channel-wise, thus they internally work on a list of
+        contiguous HxW uint8 planes (R, G, B, A) stored in `self._planes`.
+        While `self._planes` is set it is the authoritative representation;
+        `_to_interleaved` restores `self.data` from it. Planes are only ever
+        created from uint8 RGBA data, i.e., they always hold four uint8
+        planes.
+        """
+        if self._planes is None:
+            self._planes = [np.ascontiguousarray(self.data[...,k])
+                    for k in range(self.data.shape[-1])]
+        return self
+
+    def _to_interleaved(self):
+        """ Restore the interleaved `self.data` from the channel planes. """
+        if self._planes is not None:
+            self.data = np.stack(self._planes, axis=-1)
+            self._planes = None
+        return self
 
-        ## data and meta data
-        self.data = imageio.imread(filename)
-        self.meta = self.data.meta
+    def _tiled(self, fn, tile_rows=512):
+        """
+        Apply `fn` to row blocks of the channel planes.
+
+        The image is processed in blocks of `tile_rows` rows, so that the
+        transient arrays a transformation allocates (float32/int16 inter-
+        mediates) stay small enough to remain cache-resident instead of
+        streaming image-sized temporaries through memory. `fn` receives a
+        list of per-channel row-block views and must write its result into
+        them in place.
+        """
+        self._to_planes()
+        n_rows = self._planes[0].shape[0]
+        for i in range(0, n_rows, tile_rows):
+            fn([plane[i:i+tile_rows] for plane in self._planes])
+        return self
 
     def _uint8(self):
         """ Ensure that current format is numpy.uint8. """
-        ## one could pick one or all pixel and check: type(pixel) == np.uint8
-        ## but it is bad practice to check for types, thus check values only
-        if np.amin(self.data) >= 0 and np.amax(self.data) < 256:
-            self.data = np.array(self.data).astype(np.uint8)
+        if self._planes is not None: ## planes are uint8 by construction
+            return self
+        if self.data.dtype == np.uint8: ## common case, no scan necessary
+            return self
+        ## scan the data once for min and max and branch on the result
+        mn, mx = np.amin(self.data), np.amax(self.data)
+        if mn >= 0 and mx < 256:
+            self.data = np.asarray(self.data).astype(np.uint8, copy=False)
+        elif mx == mn:
+            ## constant image out of the uint8 range
+            self.data = np.zeros(self.data.shape, np.uint8)
         else:
-            self.data = np.interp(self.data,
-                    (np.amin(self.data), np.amax(self.data)),
-                    (0, 255)
-                ).astype(np.uint8)
+            ## linear rescale from [min, max] to [0, 255]; plain arithmetic
+            ## instead of the general piecewise lookup of np.interp
+            self.data = ((self.data.astype(np.float32) - mn)
+                    * (255.0/(mx-mn))).astype(np.uint8)
         return self
 
     def _rgba(self):
         """ Convert image data to RGBA shape in numpy.uint8 format. """
+        if self._planes is not None: ## planes are RGBA by construction
+            return self
+        ## dtype and shape fully determine whether anything is to do, i.e.
+        ## chained calls exit here without touching the pixel data
+        if (self.data.ndim == 3 and self.data.shape[-1] == 4
+                and self.data.dtype == np.uint8):
+            return self
         dim = len(self.data.shape)
         # assert dim==2 or dim==3, "Only grayscale(a), RGB, or RGBA supported."
         if not (dim==2 or dim==3):
@@ -259,25 +434,23 @@ class Img:
             )
         self._uint8() ## ensure uint8 format
         if dim == 2: ## grayscale, i.e. row x column
-            grayscale_to_rgba = np.array([ ## create RGB and A for RGBA
-                    [[col, col, col, 255] for col in row] for row in self.data
-                ]).astype(np.uint8)
-            self.data = grayscale_to_rgba
+            ## create RGB and A for RGBA by stacking the single channel
+            grayscale = self.data
+            self.data = np.stack(
+                    [grayscale, grayscale, grayscale,
+                     np.full(grayscale.shape, 255, np.uint8)],
+                    axis=-1
+                )
         elif dim == 3: ## row x column x pixel with pixel: RGB(A)/grayA
             if self.data.shape[-1] == 3: ## RGB case
-                rgb_to_rgba = np.array([ ## create A for RGBA
-                        [[col[0], col[1], col[2], 255] for col in row
-                        ] for row in self.data
-                    ]).astype(np.uint8)
-                self.data = rgb_to_rgba
+                ## create A for RGBA by appending a fully opaque channel
+                alpha = np.full(self.data.shape[:2] + (1,), 255, np.uint8)
+                self.data = np.concatenate([self.data, alpha], axis=-1)
             elif self.data.shape[-1] == 4: ## RGBA case
                 pass ## just for readability/understanding purpose
             elif self.data.shape[-1] == 2: ## grayscale with alpha channel case
-                grayscale_alpha_to_rgba = np.array([
-                        [[col[0], col[0], col[0], col[1]] for col in row
-                        ] for row in self.data
-                    ]).astype(np.uint8)
-                self.data = grayscale_alpha_to_rgba
+                ## repeat the gray channel as RGB and keep the alpha channel
+                self.data = self.data[..., [0, 0, 0, 1]]
             else: ## should not be met, due to previous check
                 raise InvalidImageException(
                     "Image does not conform to supported standards. Only "
@@ -292,6 +465,7 @@ class Img:
         Warnings about losing transparency can be switched on setting `warn` to
         `True`.
         """
+        self._to_interleaved()
         dim = len(self.data.shape)
 
         assert dim==2 or dim==3, "Only grayscale(a), RGB, or RGBA supported."
@@ -302,45 +476,30 @@ class Img:
             if self.data.shape[-1] == 3: ## RGB case, i.e. no alpha channel
                 return self
             elif self.data.shape[-1] == 4: ## RGBA case, i.e. alpha here
-                if warn and any(alpha != 255 for alpha in
-                        [col_a for row in self.data[:,:,3] for col_a in row]):
+                if warn and np.any(self.data[...,3] != 255):
                     if not _yn_prompt("Warning!\nLoss of transparency when "
                             "stripping alpha channel. Continue?", 'n'):
                         return self
                     else: ## user chose to lose transparency
-                        rgb_only = np.array([
-                                [[col[0], col[1], col[2]] for col in row
-                                ] for row in self.data
-                            ]).astype(np.uint8)
-                        self.data = rgb_only
+                        ## slice off alpha; ascontiguousarray detaches the view
+                        self.data = np.ascontiguousarray(self.data[..., :3])
                 else: ## all alpha 255 and/or warning is off
-                    rgb_only = np.array([
-                            [[col[0], col[1], col[2]] for col in row
-                            ] for row in self.data
-                        ]).astype(np.uint8)
-                    self.data = rgb_only
+                    self.data = np.ascontiguousarray(self.data[..., :3])
             elif self.data.shape[-1] == 2: ## grayscale with alpha channel case
-                if warn and any(alpha != 255 for alpha in
-                        [col_a for row in self.data[:,:,1] for col_a in row]):
+                if warn and np.any(self.data[...,1] != 255):
                     if not _yn_prompt("Warning!\nLoss of transparency when "
                             "stripping alpha channel. Continue?", 'n'):
                         return self
                     else: ## user chose to lose transparency
-                        grayscale_only = np.array([
-                                [col[0] for col in row] for row in self.data
-                            ]).astype(np.uint8)
-                        self.data = grayscale_only
+                        self.data = np.ascontiguousarray(self.data[..., 0])
                 else: ## all alpha 255 and/or warning is off
-                    grayscale_only = np.array([
-                            [col[0] for col in row] for row in self.data
-                        ]).astype(np.uint8)
-                    self.data = grayscale_only
+                    self.data = np.ascontiguousarray(self.data[..., 0])
             else:
                 raise Exception("Only grayscale(a), RGB, or RGBA supported.")
         return self
 
     def save(self, extension=None, savepath=None, savename=None,
-            auto_rename=True):
+            auto_rename=True, compress_level=None, quality=None):
         """
         Save current image as a file.
 
@@ -361,28 +520,47 @@ class Img:
             Choose whether the filename for saving should automatically be
             changed if the file exists already. By default set to True. If
             set set to False and the filename exists invokes a warning.
+        `compress_level` (optional) : integer (must be in range `[0, 9]`)
+            zlib compression level used when saving PNGs. Lower levels en-
+            code noticeably faster at slightly larger files. If not speci-
+            fied level 4 is used (a bit faster than the usual default 6).
+            Ignored for non-PNG formats.
+        `quality` (optional) : integer (must be in range `[0, 100]`)
+            JPEG quality setting. If not specified the writer's default is
+            used. Ignored for non-JPEG formats.
 
         Returns:
         --------
         Writes current image object as a file with the specified parameters to
         the disk.
         """
+        ## check argument validity
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise InvalidParameterException(
+                "compress_level for saving out of range [0, 9]"
+                )
+        if quality is not None and not 0 <= quality <= 100:
+            raise InvalidParameterException(
+                "quality for saving out of range [0, 100]"
+                )
+
+        ## `imageio.imwrite` needs the interleaved representation
+        self._to_interleaved()
+
         ## supported file formats/extensions using transparency
         transp_ext = ['png', ]
 
-        ## checks concerning the new image format
+        ## checks concerning the new image format; `extension` is kept
+        ## without a leading dot from here on
         if extension is None:
             extension = self.ext
-        removed_leading_dot = False
         if extension[0] == '.':
-            removed_leading_dot = True
             extension = extension[1:]
         if (len(self.data.shape)==3 and self.data.shape[-1]==4
             and extension not in transp_ext
             ):
             ## RGBA but extension would not support transparency
-            if any(alpha != 255 for alpha in
-                    [col_a for row in self.data[:,:,3] for col_a in row]):
+            if bool(np.any(self.data[...,3] != 255)):
                 ## above conditions + at least one alpha value is not 255
                 if _yn_prompt("Warning!\nThe image contains transparency "
                         "properties which are not compatible with the "
@@ -399,8 +577,7 @@ class Img:
               and extension not in transp_ext
               ):
             ## grayscale with alpha but extension would not support alpha
-            if any(alpha != 255 for alpha in
-                    [val_a for row in self.data[:,:,1] for val_a in row]):
+            if bool(np.any(self.data[...,1] != 255)):
                 ## above conditions + at least one alpha value is not 255
                 if _yn_prompt("Warning!\nThe image contains transparency "
                         "properties which are not compatible with the "
@@ -416,54 +593,65 @@ class Img:
         else:
             ## not a known transparency format, so hopefully no problem
             pass
-        ## append leading dot (was removed above if existing earlier)
-        if removed_leading_dot:
-            extension = "." + extension
+        suffix = "." + extension
 
-        ## checks concerning the savepath
+        ## checks concerning the savepath; normalized once via pathlib
         sp_flag = True ## assume `savepath` is set
         if savepath is None:
             savepath = self.path
             sp_flag = False ## `savepath` is not set by the user
-        if not os.path.isdir(savepath):
+        save_dir = pathlib.Path(savepath).expanduser()
+        if not save_dir.is_dir():
             if sp_flag:
                 print("Warning!\nThe specified path for saving does not "
                     "exist.\nUsing the path of the source file instead.")
-                savepath = self.path
+                save_dir = pathlib.Path(self.path)
             else: ## path of the source file does not exist anymore
                 raise IOError("Path for saving does not exist anymore!")
         ## adjust path, in case it is a relative path
-        savepath = os.path.abspath(savepath)
+        save_dir = save_dir.resolve()
 
-        def quick_renamer(savepath, savename, extension):
+        ## snapshot the directory content once; probing against this set
+        ## avoids one isfile syscall per renaming attempt
+        existing = set(os.listdir(save_dir))
+
+        def quick_renamer(savename, suffix):
             """ Find a filename for a non-existing file. """
             nc = 1 ## name counter
-            while True:
-                temp_name = savename + "_{}".format(nc)
-                if os.path.isfile(os.path.join(savepath, temp_name+extension)):
-                    nc += 1
-                    continue
-                else:
-                    return temp_name
+            while savename + "_{}".format(nc) + suffix in existing:
+                nc += 1
+            return savename + "_{}".format(nc)
 
         ## checks concerning the filename
         if savename is None:
             savename = self.name
-        if savename.rsplit('.', 1)[-1] == extension[1:]:
+        if savename.rsplit('.', 1)[-1] == extension:
             savename = savename.rsplit('.', 1)[0]
-        if os.path.isfile(os.path.join(savepath, savename+extension)):
+        if savename + suffix in existing:
             if not auto_rename and not _yn_prompt("Warning!\nFile '{}' "
                     "exists already.\nDo you want to overwrite it?"
-                    .format(savename+extension), 'n'):
-                savename = quick_renamer(savepath, savename, extension)
+                    .format(savename+suffix), 'n'):
+                savename = quick_renamer(savename, suffix)
             else:
-                savename = quick_renamer(savepath, savename, extension)
+                savename = quick_renamer(savename, suffix)
                 print("File exists already. Using filename '{}' instead."
-                    .format(savename + extension))
+                    .format(savename + suffix))
 
         ## saving the data as an image file
-        fullsave = os.path.join(savepath, savename+extension)
-        imageio.imwrite(fullsave, self.data)
+        fullsave = str(save_dir / (savename+suffix))
+        write_args = {}
+        if extension.lower() == 'png':
+            write_args['compress_level'] = \
+                4 if compress_level is None else compress_level
+        elif extension.lower() in ('jpg', 'jpeg') and quality is not None:
+            write_args['quality'] = quality
+        ## hand the writer a C-contiguous buffer; otherwise the backend
+        ## silently makes its own copy and doubles the peak memory
+        if self.data.flags['C_CONTIGUOUS']:
+            data_out = self.data
+        else:
+            data_out = np.ascontiguousarray(self.data)
+        imageio.imwrite(fullsave, data_out, **write_args)
         print("Success. Wrote '{}' to disk.".format(fullsave))
         return self
 
@@ -497,32 +685,31 @@ class Img:
                 "Method for grayscaling must be 'luminosity' or 'average'."
             )
 
-        if method == 'luminosity':
-            def _meth(r, g, b):
-                return 0.299*r + 0.587*g + 0.114*b
-        else:
-            def _meth(r, g, b):
-                return (1./3.)*r + (1./3.)*g + (1./3.)*b
-        def _graysc_r(r, g, b):
-            return (1.-factor)*r + factor*_meth(r, g, b)
-        def _graysc_g(r, g, b):
-            return (1.-factor)*g + factor*_meth(r, g, b)
-        def _graysc_b(r, g, b):
-            return (1.-factor)*b + factor*_meth(r, g, b)
         self._uint8()._rgba()
 
-        ## adjust grayscale according to parameters
-        self.data = np.array([
-                [   [
-                    _graysc_r(col[0], col[1], col[2]),
-                    _graysc_g(col[0], col[1], col[2]),
-                    _graysc_b(col[0], col[1], col[2]),
-                    col[3]
-                    ] for col in row
-                ] for row in self.data
-            ]).astype(np.uint8)
+        ## adjust grayscale according to parameters; each new channel is the
+        ## blend of the old one with the weighted gray value, evaluated via
+        ## fixed-point lookup tables (cf. `_build_luts`) on the contiguous
+        ## channel planes block by block (cf. `_tiled`)
+        luts = _build_luts(factor, method)
+
+        if factor == 1.: ## all three output channels are identical
+            lut_r, lut_g, lut_b = luts[0]
+            def _blend_block(planes):
+                r, g, b = planes[0], planes[1], planes[2]
+                gray = ((lut_r[r] + lut_g[g] + lut_b[b]) >> 8
+                    ).astype(np.uint8)
+                r[:] = gray
+                g[:] = gray
+                b[:] = gray
+        else:
+            def _blend_block(planes):
+                r, g, b = planes[0], planes[1], planes[2]
+                new = [((lr[r] + lg[g] + lb[b]) >> 8).astype(np.uint8)
+                        for lr, lg, lb in luts]
+                r[:], g[:], b[:] = new
 
-        return self
+        return self._tiled(_blend_block)
 
     def grayscale_to_transp(self, color='white', check_grayscale=True,
             leave_alpha=False, c=None, cgs=None, la=None):
@@ -549,9 +736,13 @@ class Img:
             case it is not fully opaque. By default, i.e. False, the alpha
             value will still be changed, regardless of previous transparency.
         """
-        ## check input data validity
-        dim = len(self.data.shape)
-        assert dim==2 or dim==3, "Only grayscale(a), RGB, or RGBA supported."
+        ## check input data validity (planes are always valid RGBA)
+        if self._planes is None:
+            dim = len(self.data.shape)
+            assert dim==2 or dim==3, \
+                "Only grayscale(a), RGB, or RGBA supported."
+        else:
+            dim = 3
 
         ## tend to alternative argument names
         if c is None:
@@ -573,26 +764,28 @@ class Img:
         self._uint8()
 
         ## check_grayscale
-        if check_grayscale and dim == 3: ## dim == 2 is by definition grayscale
-            px_dim = self.data.shape[-1] ## each pixel's structure
+        if cgs and dim == 3: ## dim == 2 is by definition grayscale
+            if self._planes is not None:
+                px_dim = len(self._planes)
+            else:
+                px_dim = self.data.shape[-1] ## each pixel's structure
             if px_dim == 4 or px_dim == 3: ## RGBA or RGB
                 ## px_dim == 2 is grayscale with alpha, i.e. no need to check
-                dim_row, dim_col = len(self.data), len(self.data[0])
+                ## a pixel is colored if its channels are not all identical
+                if self._planes is not None:
+                    r, g, b = self._planes[:3]
+                else:
+                    r, g, b = (self.data[...,0], self.data[...,1],
+                            self.data[...,2])
+                ## scan in row chunks: a color pixel near the top stops the
+                ## scan early and the transient boolean stays cache-sized
+                chunk = 256
                 found_color = False
-                i = 0
-                while i < dim_row:
-                    j = 0
-                    while j < dim_col:
-                        if not (self.data[i,j,0] == self.data[i,j,1]
-                                == self.data[i,j,2]):
-                            found_color = True
-                            break
-                        else:
-                            j += 1
-                    if found_color:
+                for i in range(0, r.shape[0], chunk):
+                    if np.any((r[i:i+chunk] != g[i:i+chunk])
+                            | (g[i:i+chunk] != b[i:i+chunk])):
+                        found_color = True
                         break
-                    else:
-                        i += 1
                 if found_color and not _yn_prompt("Warning!\nThe image data "
                         "do not correspond to a grayscale image.\nResults "
                         "will be grayscaled and transparent based on the "
@@ -604,71 +797,78 @@ class Img:
         ## faster for other formats)
         self._rgba()
 
-        ## define method based on specified parameters (cf. comment below)
-        if c == 'w':
-            if la:
-                def _newpix(pix):
-                    if pix[3] != 255:
-                        return [pix[0], pix[0], pix[0], pix[3]]
-                    else:
-                        return [pix[0], pix[0], pix[0], 255-pix[0]]
-            else: ## la == False
-                def _newpix(pix):
-                    if int(pix[3])-int(pix[0]) < 0:
-                        return [pix[0], pix[0], pix[0], 0]
-                    else:
-                        return [pix[0], pix[0], pix[0], pix[3]-pix[0]]
-        else: ## c == 'b'
-            if la:
-                def _newpix(pix):
-                    if pix[3] != 255:
-                        return [pix[0], pix[0], pix[0], pix[3]]
-                    else:
-                        return [pix[0], pix[0], pix[0], pix[0]]
-            else: ## la == False
-                def _newpix(pix):
-                            if int(pix[3])-255+int(pix[0]) < 0:
-                                return [pix[0], pix[0], pix[0], 0]
-                            else:
-                                return [pix[0], pix[0], pix[0],
-                                        pix[3]-255+pix[0]]
-
-        ## a more comprehensive version of the code above, but this here always
-        ## checks the specified parameters, i.e., the upper definition should
-        ## be more favorable
-        #def _new_pix(pix, c, la):
-        #    if c == 'w':
-        #        if la:
-        #            if pix[3] != 255:
-        #                return [pix[0], pix[0], pix[0], pix[3]]
-        #            else: ## pix[3] == 255
-        #                ## 255-pix[0] is the same as pix[3]-pix[0]
-        #                return [pix[0], pix[0], pix[0], 255-pix[0]]
-        #        else: ## la == False
-        #            new_alpha = pix[3] - pix[0]
-        #            if new_alpha < 0:
-        #                return [pix[0], pix[0], pix[0], 0]
-        #            else: ## pix[3]-pix[0] >= 0
-        #                return [pix[0], pix[0], pix[0], new_alpha]
-        #    else: # c == 'b'
-        #        if la:
-        #            if pix[3] != 255:
-        #                return [pix[0], pix[0], pix[0], pix[3]]
-        #            else: ## pix[3] == 255
-        #                return [pix[0], pix[0], pix[0], pix[0]]
-        #        else: ## la == False
-        #            new_alpha = pix[3] - 255 + pix[0]
-        #            if new_alpha < 0:
-        #                return [pix[0], pix[0], pix[0], 0]
-        #            else: ## pix[3]-(255-pix[0]) >= 0
-        #                return [pix[0], pix[0], pix[0], new_alpha]
-
-        ## convert grayscale to transparent
-        self.data = np.array([
-                [_newpix(col) for col in row] for row in self.data
-            ]).astype(np.uint8)
+        ## convert grayscale to transparent based on specified parameters;
+        ## the old alpha channel only survives for pixels which are not fully
+        ## opaque if `leave_alpha` is set; otherwise the new alpha is the old
+        ## one reduced by the amount of reference color, clipped at 0 (the
+        ## int16 cast avoids uint8 wrap-around before clipping)
+        if _kernels.HAVE_NUMBA:
+            ## JIT-compiled in-place kernel, parallel over the image rows;
+            ## operates on the interleaved representation
+            self._to_interleaved()
+            _kernels.gs_transp(self.data, c == 'w', la)
+            return self
+        return self._tiled(_TRANSP_KERNELS[(c, bool(la))])
 
-        return self
+    def to_gray_transp(self, factor=1.0, method='luminosity', color='white',
+            leave_alpha=False, c=None, la=None):
+        """
+        Convert to grayscale and brightness-based transparency in one pass.
+
+        Fuses `grayscale` and `grayscale_to_transp`: the chained call tra-
+        verses the whole image twice, while this method computes the gray
+        value and the new alpha per row block in a single traversal, i.e.,
+        the same result at half the memory traffic. The grayscale check of
+        `grayscale_to_transp` is skipped since the data is grayscaled here
+        anyway.
+
+        Parameters:
+        -----------
+        `factor` (optional) : float (must be in range `[0, 1]`)
+            Amount of grayscaling, cf. `grayscale`.
+        `method` (optional) : `'luminosity'` or `'average'`
+            Grayscaling method, cf. `grayscale`.
+        `color`/`c` (optional) : [`'w'`, `'white'`] / [`'b'`, `'black'`]
+            Reference color for the transparency conversion, cf.
+            `grayscale_to_transp`.
+        `leave_alpha`/`la` (optional) : boolean
+            Whether pixels which are not fully opaque keep their alpha
+            value, cf. `grayscale_to_transp`.
+        """
+        ## check argument validity (same rules as in the fused methods)
+        if factor<0. or factor>1.:
+            raise InvalidParameterException(
+                "Factor for grayscaling out of range [0, 1]"
+                )
+        if not (method=='luminosity' or method=='average'):
+            raise InvalidParameterException(
+                "Method for grayscaling must be 'luminosity' or 'average'."
+            )
+        if c is None:
+            c = color
+        if la is None:
+            la = leave_alpha
+        if not c in ['w', 'white', 'b', 'black']:
+            raise InvalidParameterException("Invalid color parameter.")
+        if c == 'white':
+            c = 'w'
+        elif c == 'black':
+            c = 'b'
+
+        self._uint8()._rgba()
+
+        ## the gray value is the first output channel of the grayscale
+        ## blend (cf. `_build_luts`); the transparency kernel then reads it
+        ## from the first plane and spreads it over the RGB planes
+        lut_r, lut_g, lut_b = _build_luts(factor, method)[0]
+        transp = _TRANSP_KERNELS[(c, bool(la))]
+
+        def _fused_block(planes):
+            planes[0][:] = ((lut_r[planes[0]] + lut_g[planes[1]]
+                    + lut_b[planes[2]]) >> 8).astype(np.uint8)
+            transp(planes)
+
+        return self._tiled(_fused_block)
 
 
 if __name__ == "__main__":
@@ -683,13 +883,14 @@ if __name__ == "__main__":
 
     ## NOTE - Regarding Performance Enhancements:
     '''
-    ## More efficient handling of the data (i.e., making better use of numpy)
-    ## can be done similar to this example from the imageio docs:
+    ## The per-pixel Python loops of the original proof of concept have been
+    ## replaced by vectorized numpy code working on channel planes (plus an
+    ## optional numba fast path, cf. _kernels.py), in the spirit of this
+    ## example from the imageio docs:
     ## <url>
     ##  https://imageio.readthedocs.io/en/stable/examples.html
     ##  #convert-a-short-movie-to-grayscale
     ## </url>
-    ## This is not implemented (yet), due to the proof-of-concept status.
     '''
 
     ## input images for testing purposes